@@ -1,58 +1,150 @@
+from __future__ import annotations
+
 import asyncio
 import atexit
 import cProfile
 import logging
 import logging.handlers
+import os
 import pstats
 import sys
 import typing
 from pathlib import Path
 from queue import SimpleQueue
 
-import aiosqlite
+import aiohttp
 import colored  # type: ignore[reportMissingTypeStubs]
 import tqdm  # type: ignore[reportMissingTypeStubs]
 
 import utils
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 if typing.TYPE_CHECKING:
+    import aiosqlite
     from bs4 import ResultSet, Tag
 
+# Number of trim sources to write to the database per transaction
+BATCH_SIZE = 100
+# Number of trims to read from the database at a time
+FETCH_SIZE = 250
+# Maximum number of trim sources to fetch at the same time
+MAX_CONCURRENT_REQUESTS = 64
+
+
+async def fetch_source(
+    trim_id: int,
+    trim_url: str,
+    semaphore: asyncio.Semaphore,
+) -> tuple[int, str, bytes]:
+    """Get the raw source code for a trim, limiting the number of concurrent requests.
+
+    A trim whose source could not be fetched gets an empty source.
+    """
+    async with semaphore:
+        try:
+            return trim_id, trim_url, await utils.fetch_html(trim_url)
+        except (aiohttp.ClientError, TimeoutError):
+            logger.exception("Error getting the source for %s", trim_url)
+            return trim_id, trim_url, b""
+
+
+async def write_sources(
+    db: aiosqlite.Connection,
+    rows: list[tuple[bytes, int]],
+) -> None:
+    """Write a batch of trim sources to the database in a single transaction."""
+    async with db.cursor() as cursor:
+        await cursor.executemany(
+            "UPDATE trims SET children_source = ? WHERE id = ?",
+            rows,
+        )
+    await db.commit()
+
+
+async def drain_sources(
+    db: aiosqlite.Connection,
+    queue: asyncio.Queue[tuple[bytes, int] | None],
+) -> None:
+    """Write the trim sources from the queue to the database until it gets None."""
+    pending: list[tuple[bytes, int]] = []
+    while (row := await queue.get()) is not None:
+        pending.append(row)
+        if len(pending) >= BATCH_SIZE:
+            await write_sources(db, pending)
+            pending.clear()
+
+    # Write the remaining sources
+    if pending:
+        await write_sources(db, pending)
+
 
 async def main(db: aiosqlite.Connection) -> None:
     """Get the source code for the Trims page."""
     logger.info("Connected to the database.")
 
-    # Get all the trims from the database whose children_source column is empty
-    trims = await db.execute_fetchall(
-        "SELECT * FROM trims WHERE children_source IS NULL",
+    # Count the trims from the database whose children_source column is empty
+    n_trims = next(
+        iter(
+            await db.execute_fetchall(
+                "SELECT COUNT(*) FROM trims WHERE children_source IS NULL",
+            ),
+        ),
     )
-    logger.info("Got %d trims from the database.", len(trims))
+    logger.info("Got %d trims from the database.", n_trims[0])
+
+    # Write the sources from a single task while the trims are being fetched
+    queue: asyncio.Queue[tuple[bytes, int] | None] = asyncio.Queue()
+    writer = asyncio.create_task(drain_sources(db, queue))
 
-    # Get the source code for the trims
-    for trim in tqdm.tqdm(
-        trims,
+    # Get the source code for the trims, streaming them from the database
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    p_bar = tqdm.tqdm(
+        total=n_trims[0],
         desc="Getting trims",
         smoothing=0,
-    ):
-        trim_id = trim[0]
-        trim_url = trim[3]
-
-        # Get the source code for the trim
-        trim_source = await utils.get_source(trim_url)
-        if not trim_source:
-            logger.error("No source code found for %s", trim_url)
-            continue
-
-        # Update the database with the source code
-        await db.execute(
-            "UPDATE trims SET children_source = ? WHERE id = ?",
-            (str(trim_source), trim_id),
-        )
-        await db.commit()
+    )
+    tasks: list[asyncio.Task[tuple[int, str, bytes]]] = []
+    try:
+        async with db.execute(
+            "SELECT id, url FROM trims WHERE children_source IS NULL",
+        ) as cursor:
+            while trims := await cursor.fetchmany(FETCH_SIZE):
+                tasks = [
+                    asyncio.create_task(fetch_source(trim_id, trim_url, semaphore))
+                    for trim_id, trim_url in trims
+                ]
+                for task in asyncio.as_completed(tasks):
+                    # Stop as soon as the writer fails, rather than after every fetch
+                    if writer.done():
+                        await writer
+                    trim_id, trim_url, trim_source = await task
+                    p_bar.update(1)
+                    if not trim_source:
+                        logger.error("No source code found for %s", trim_url)
+                        continue
+
+                    # Queue the compressed source code to be written to the database
+                    await queue.put((utils.compress_html(trim_source), trim_id))
+    finally:
+        for task in tasks:
+            task.cancel()
+        p_bar.close()
+        await utils.close_session()
+
+        # Wait for the writer to flush the remaining sources
+        await queue.put(None)
+        await writer
 
 
 if __name__ == "__main__":
+    # Use uvloop as the event loop when it is available
+    if uvloop is not None:
+        uvloop.install()
+
     # Set up the logger
     file_handler = logging.FileHandler("km77.log", mode="w", encoding="utf-8")
     file_handler.setLevel(logging.DEBUG)
@@ -69,8 +161,9 @@ if __name__ == "__main__":
         respect_handler_level=True,
     )
 
+    # Only log debug messages when requested, as they are emitted in hot loops
     logging.basicConfig(
-        level=logging.NOTSET,
+        level=logging.DEBUG if os.environ.get("LOG_DEBUG") else logging.INFO,
         handlers=[queue_handler],
         encoding="utf-8",
     )
@@ -97,21 +190,28 @@ if __name__ == "__main__":
         with Path.open(utils.DATABASE_FILE_PATH, "w") as f:
             pass
 
-    with cProfile.Profile() as pr:
-        listener.start()
-        atexit.register(listener.stop)
+    listener.start()
+    atexit.register(listener.stop)
 
-        db = asyncio.new_event_loop().run_until_complete(
-            aiosqlite.connect(utils.DATABASE_FILE_PATH),
-        )
+    db = asyncio.new_event_loop().run_until_complete(
+        utils.connect_database(),
+    )
+
+    # Only profile when requested, as cProfile slows down every function call
+    profiler = cProfile.Profile() if os.environ.get("PROFILE") else None
     try:
+        if profiler is not None:
+            profiler.enable()
         asyncio.run(main(db=db))
-        # stats = pstats.Stats(pr) # noqa: ERA001
-        # stats.strip_dirs() # noqa: ERA001
-        # stats.sort_stats("cumulative") # noqa: ERA001
-        # stats.print_stats(20) # noqa: ERA001
     except KeyboardInterrupt:
         logger.info("User interrupted the program.")
         asyncio.new_event_loop().run_until_complete(db.close())
 
+    if profiler is not None:
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        stats.strip_dirs()
+        stats.sort_stats("cumulative")
+        stats.print_stats(20)
+
     sys.exit()
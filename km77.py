@@ -5,7 +5,9 @@ import atexit
 import cProfile
 import logging
 import logging.handlers
+import os
 import pstats
+import re
 import sys
 import typing
 from pathlib import Path
@@ -13,13 +15,27 @@ from queue import SimpleQueue
 
 import aiosqlite
 import tqdm  # type: ignore[reportMissingTypeStubs]
+from bs4 import SoupStrainer
 
 import utils
 from make import Make
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 if typing.TYPE_CHECKING:
     from bs4 import ResultSet, Tag
 
+# Query string to list both the available and the discontinued models of a make
+MARKET_QUERY = "?market[]=available&market[]=discontinued"
+# Only the brand blocks are needed from the Makes page
+MAKES_STRAINER = SoupStrainer(
+    "div",
+    class_=re.compile(r"(?:^|\s)js-brand-item(?:\s|$)"),
+)
+
 
 async def main(
     db: aiosqlite.Connection,
@@ -34,7 +50,7 @@ async def main(
     # ! Get the Makes
     if not makes_list:
         # Get the source code of the Makes page
-        soup = await utils.get_source(f"{utils.BASE_URL}/coches")
+        soup = await utils.get_source(f"{utils.BASE_URL}/coches", MAKES_STRAINER)
         logger.info("Got the source code of the Makes page.")
 
         # Find all the car brands in the page
@@ -44,6 +60,9 @@ async def main(
 
         # Get the makes and their URLs
         # makes_names = makes_names[:1] # For testing purposes # noqa: ERA001
+        next_id = await utils.get_next_id("makes", db=db)
+        known_make_names = {make_obj.name for make_obj in makes_list}
+        base_url = utils.BASE_URL
         for html_element in tqdm.tqdm(
             makes_names,
             desc="Generating makes",
@@ -51,22 +70,20 @@ async def main(
         ):
             a_tag = html_element.find("a")
             make_name = a_tag.text if a_tag else html_element.text
-            if any(make_obj.name == make_name for make_obj in makes_list):
+            if make_name in known_make_names:
                 continue
             make_url = str(a_tag["href"])  # type: ignore[reportArgumentType]
-            next_id = await utils.get_next_id("makes", db=db)
             make_obj = Make(
                 ident=next_id,
                 name=make_name,
-                children_url=utils.BASE_URL
-                + make_url
-                + "?market[]=available&market[]=discontinued",
+                children_url=base_url + make_url + MARKET_QUERY,
             )
             makes_list.append(make_obj)
+            known_make_names.add(make_name)
+            next_id += 1
 
-            # Insert the make into the database
-            logger.debug("Inserting %s into the database.", make_obj)
-            await utils.insert_into_database(make_obj, "makes", db=db)
+        # Insert the makes into the database
+        await utils.insert_into_database(makes_list, "makes", db=db)
 
         logger.info("Generated %d makes.", len(makes_list))
 
@@ -75,10 +92,7 @@ async def main(
 
     # # ! Get the Models for each Make
     # makes_list = makes_list[:2]  # For testing purposes
-    if not all(
-        make.models
-        for make in tqdm.tqdm(makes_list, desc="Getting models", smoothing=0)
-    ):
+    if not all(make.models for make in makes_list):
         await utils.get_children_sources(
             parents_list=makes_list,
             db=db,
@@ -94,10 +108,7 @@ async def main(
     # ! Get the Trims for each Model
     all_models = [model for make in makes_list for model in make.models]
     # all_models = all_models[:10]  # For testing purposes
-    if not all(
-        model.trims
-        for model in tqdm.tqdm(all_models, desc="Getting trims", smoothing=0)
-    ):
+    if not all(model.trims for model in all_models):
         await utils.get_children_sources(
             parents_list=all_models,
             db=db,
@@ -113,10 +124,7 @@ async def main(
     # ! Get the Specs and Options for each Trim
     all_trims = [trim for model in all_models for trim in model.trims]
     # all_trims = all_trims[:10]  # For testing purposes # noqa: ERA001
-    if not all(
-        trim.specs
-        for trim in tqdm.tqdm(all_trims, desc="Getting specs and options", smoothing=0)
-    ):
+    if not all(trim.specs for trim in all_trims):
         await utils.get_children_sources(
             parents_list=all_trims,
             db=db,
@@ -131,10 +139,15 @@ async def main(
 
     # Close everything
     logger.info("Done.")
+    await utils.close_session()
     await db.close()
 
 
 if __name__ == "__main__":
+    # Use uvloop as the event loop when it is available
+    if uvloop is not None:
+        uvloop.install()
+
     # Set up the logger
     file_handler = logging.FileHandler("km77.log", mode="w", encoding="utf-8")
     file_handler.setLevel(logging.DEBUG)
@@ -151,8 +164,9 @@ if __name__ == "__main__":
         respect_handler_level=True,
     )
 
+    # Only log debug messages when requested, as they are emitted in hot loops
     logging.basicConfig(
-        level=logging.NOTSET,
+        level=logging.DEBUG if os.environ.get("LOG_DEBUG") else logging.INFO,
         handlers=[queue_handler],
         encoding="utf-8",
     )
@@ -179,21 +193,28 @@ if __name__ == "__main__":
         with Path.open(utils.DATABASE_FILE_PATH, "w") as f:
             pass
 
-    with cProfile.Profile() as pr:
-        listener.start()
-        atexit.register(listener.stop)
+    listener.start()
+    atexit.register(listener.stop)
 
-        db = asyncio.new_event_loop().run_until_complete(
-            aiosqlite.connect(utils.DATABASE_FILE_PATH),
-        )
+    db = asyncio.new_event_loop().run_until_complete(
+        utils.connect_database(),
+    )
+
+    # Only profile when requested, as cProfile slows down every function call
+    profiler = cProfile.Profile() if os.environ.get("PROFILE") else None
     try:
+        if profiler is not None:
+            profiler.enable()
         asyncio.run(main(db=db))
-        # stats = pstats.Stats(pr) # noqa: ERA001
-        # stats.strip_dirs() # noqa: ERA001
-        # stats.sort_stats("cumulative") # noqa: ERA001
-        # stats.print_stats(20) # noqa: ERA001
     except KeyboardInterrupt:
         logger.info("User interrupted the program.")
         asyncio.new_event_loop().run_until_complete(db.close())
 
+    if profiler is not None:
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        stats.strip_dirs()
+        stats.sort_stats("cumulative")
+        stats.print_stats(20)
+
     sys.exit()
@@ -2,8 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import TYPE_CHECKING
+import re
+from typing import TYPE_CHECKING, ClassVar
+
+from bs4 import SoupStrainer
 
 import model
 import utils
@@ -16,9 +20,36 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+def parse_models(source: Tag, make_name: str) -> list[tuple[str, str]]:
+    """Parse the name and href of each model in a make's source."""
+    models: list[tuple[str, str]] = []
+    for model_html in source.find_all("li", class_="vehicle-block"):
+        # Parse the model's:
+        # - Name
+        # - Href
+        try:
+            model_name_html = model_html.find("div", class_="veh-name")
+            model_name = model_name_html.text.split("|")[0].strip()
+            model_url = model_html.find("a")["href"]
+        except AttributeError:
+            logger.exception("Error getting model for %s", make_name)
+            break
+        models.append((model_name, model_url))
+    return models
+
+
 class Make:
     """Make class."""
 
+    # Table the makes are stored in
+    TABLE: ClassVar[str] = "makes"
+
+    # Only the model blocks are needed from the make's source
+    CHILDREN_STRAINER: ClassVar[SoupStrainer | None] = SoupStrainer(
+        "li",
+        class_=re.compile(r"(?:^|\s)vehicle-block(?:\s|$)"),
+    )
+
     def __init__(
         self: Make,
         ident: int,
@@ -30,6 +61,7 @@ class Make:
         self.name = name
         self.children_url = children_url
         self.models: list[model.Model] = []
+        self._model_names: set[str] = set()
 
         self.children_source: Tag | None = None
 
@@ -37,9 +69,14 @@ class Make:
         """Return the Make's name."""
         return self.name
 
+    def to_row(self: Make) -> tuple[int, str, str]:
+        """Return the Make's row for utils.INSERT_SQL."""
+        return (self.id, self.name, self.children_url)
+
     def add_model(self: Make, model: model.Model) -> None:
         """Add a model to the Make's list of models."""
         self.models.append(model)
+        self._model_names.add(model.name)
 
     async def get_models(
         self: Make,
@@ -53,31 +90,30 @@ class Make:
         if not self.children_source:
             logger.error("No source found for %s", self.name)
             return
-        models = self.children_source.find_all("li", class_="vehicle-block")
+        # Parse the source in a thread to keep the event loop free
+        models = await asyncio.to_thread(
+            parse_models,
+            self.children_source,
+            self.name,
+        )
 
         # Get the models
-        for model_html in models:
-            # Parse the model's:
-            # - Name
-            # - Year
-            # - Href
-            try:
-                model_name_html = model_html.find("div", class_="veh-name")
-                model_name = model_name_html.text.split("|")[0].strip()
-                if all(model_obj.name != model_name for model_obj in self.models):
-                    model_year = model_name_html.find("span").text
-                    model_url = model_html.find("a")["href"]
-                    next_id = await utils.get_next_id("models", db=db)
-                    model_obj = model.Model(
-                        ident=next_id,
-                        name=model_name,
-                        children_url=utils.BASE_URL + model_url + "/datos",
-                        make=self,
-                    )
-                    # Insert the model into the database
-                    await utils.insert_into_database(model_obj, "models", db=db)
-                    # Add the model to the make
-                    self.add_model(model_obj)
-            except AttributeError:
-                logger.exception("Error getting model for %s", self.name)
-                return
+        next_id = await utils.get_next_id("models", db=db)
+        new_models: list[model.Model] = []
+        for model_name, model_url in models:
+            if model_name in self._model_names:
+                continue
+            model_obj = model.Model(
+                ident=next_id,
+                name=model_name,
+                children_url=utils.BASE_URL + model_url + "/datos",
+                make=self,
+            )
+            # Add the model to the make
+            self.add_model(model_obj)
+            new_models.append(model_obj)
+            next_id += 1
+
+        # Insert the new models into the database
+        if new_models:
+            await utils.insert_into_database(new_models, "models", db=db)
@@ -2,8 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import TYPE_CHECKING
+import re
+from typing import TYPE_CHECKING, ClassVar
+
+from bs4 import SoupStrainer
 
 import trim
 import utils
@@ -17,9 +21,36 @@ if TYPE_CHECKING:
     import make
 
 
+def parse_trims(source: Tag, model_name: str) -> list[tuple[str, str]]:
+    """Parse the name and href of each trim in a model's source."""
+    trims: list[tuple[str, str]] = []
+    for trim_html in source.find_all("td", class_="vehicle-name"):
+        # Parse the trim's:
+        # - Name
+        # - Href
+        try:
+            trim_a = trim_html.find("a")
+            trim_name = trim_a.text.split("\n")[1].strip()
+            trim_href = trim_a["href"]
+        except (AttributeError, IndexError):
+            logger.exception("Error getting trim for %s", model_name)
+            break
+        trims.append((trim_name, trim_href))
+    return trims
+
+
 class Model:
     """Model class for representing a car model object."""
 
+    # Table the models are stored in
+    TABLE: ClassVar[str] = "models"
+
+    # Only the trim cells are needed from the model's source
+    CHILDREN_STRAINER: ClassVar[SoupStrainer | None] = SoupStrainer(
+        "td",
+        class_=re.compile(r"(?:^|\s)vehicle-name(?:\s|$)"),
+    )
+
     def __init__(
         self: Model,
         ident: int,
@@ -38,20 +69,23 @@ class Model:
         self.make: make.Make
 
         self.trims: list[trim.Trim] = []
+        self._trim_names: set[str] = set()
+
+    def to_row(self: Model) -> tuple[int, int, str, str]:
+        """Return the Model's row for utils.INSERT_SQL."""
+        return (self.id, self.make.id, self.name, self.children_url)
 
     def add_trim(self: Model, trim: trim.Trim) -> None:
         """Add a trim to the model's list of trims."""
         self.trims.append(trim)
+        self._trim_names.add(trim.name)
 
     async def get_trims(
         self: Model,
         db: aiosqlite.Connection,
     ) -> None:
         """Get the trims for a given model."""
-        # Get the trim's:
-        # - Name
-        # - Production dates
-        # - Href
+        new_trims: list[trim.Trim] = []
         try:
             # Check if the model has no trims
             if "informacion" in self.children_url:
@@ -61,33 +95,36 @@ class Model:
             if not self.children_source:
                 logger.error("No source found for %s", self.name)
                 return
-            trims_html = self.children_source.find_all("td", class_="vehicle-name")
-            logger.debug("Found %s trims for %s", str(len(trims_html)), self.name)
-            if not trims_html:
+            # Parse the source in a thread to keep the event loop free
+            trims = await asyncio.to_thread(
+                parse_trims,
+                self.children_source,
+                self.name,
+            )
+            logger.debug("Found %d trims for %s", len(trims), self.name)
+            if not trims:
                 logger.error("No trims found for %s %s", self.make.name, self.name)
                 return
-            for trim_html in trims_html:
-                trim_name = trim_html.find("a").text.split("\n")[1].strip()
+            next_id = await utils.get_next_id("trims", db=db)
+            for trim_name, trim_href in trims:
                 # Check if there is already a trim with the same name
-                if any(trim_obj.name == trim_name for trim_obj in self.trims):
+                if trim_name in self._trim_names:
                     # Skip the trim if it already exists
                     continue
 
-                trim_production = (
-                    trim_html.find("span").text.split("\n")[0].strip() + ")"
-                )
-                trim_href = trim_html.find("a")["href"]
-                next_id = await utils.get_next_id("trims", db=db)
                 new_trim_obj = trim.Trim(
                     ident=next_id,
                     name=trim_name,
                     children_url=utils.BASE_URL + trim_href,
                     model=self,
                 )
-                # Insert the trim into the database
-                await utils.insert_into_database(new_trim_obj, "trims", db=db)
                 # Add the trim to the model
                 self.add_trim(trim=new_trim_obj)
+                new_trims.append(new_trim_obj)
+                next_id += 1
         except Exception:
             logger.exception("Error getting trims for %s", self.name)
-            return
+
+        # Insert the new trims into the database
+        if new_trims:
+            await utils.insert_into_database(new_trims, "trims", db=db)
@@ -1,39 +1,257 @@
 """Filter the database according to various parameters."""
 
+from __future__ import annotations
+
 import asyncio
 import atexit
+import functools
+import hashlib
 import logging
 import logging.handlers
-from queue import SimpleQueue
+import multiprocessing
+import os
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
 
 import aiosqlite
 import bs4
-from bs4 import NavigableString, ResultSet, Tag
+from bs4 import NavigableString, ResultSet, SoupStrainer, Tag
 from tqdm import tqdm
 
 import utils
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
+if TYPE_CHECKING:
+    from multiprocessing.queues import Queue
+
+    # A trim's id, stored source and source hash
+    QueuedTrim = tuple[int, bytes | str, bytes]
+    # A trim's id, source hash and values
+    ParsedTrim = tuple[int, bytes, dict[str, str]]
+
+logger = logging.getLogger(__name__)
+
+# Bump when parse_trim_html changes, so every trim is parsed again
+PARSER_VERSION = 1
+# Number of trims to read from the database at a time
+BATCH_SIZE = 250
+# Number of trims to write to the database per transaction
+COMMIT_SIZE = 200
+# Maximum number of trims waiting to be parsed or written
+QUEUE_SIZE = 64
+# Number of trims being parsed at the same time, enough to keep every process busy
+PARSER_COUNT = 2 * (os.cpu_count() or 1)
+# The "tr" elements whose "td" contains any of these texts are skipped
+SKIP_TRS = [
+    "Sólo en paquete",
+    # "€",
+]
+SKIP_TRS_PATTERN = re.compile("|".join(map(re.escape, SKIP_TRS)))
+# Characters replaced by "_" in the column names
+SANITIZE_TABLE = str.maketrans(dict.fromkeys(" -/().,", "_"))
+# Only the "mainbar" divs of a trim's source hold its specs and options
+MAINBAR_STRAINER = SoupStrainer(
+    "div",
+    class_=re.compile(r"(?:^|\s)mainbar(?:\s|$)"),
+)
+
 
+@functools.lru_cache(maxsize=4096)
 def sanitize_text(text: str) -> str:
-    """Sanitize the text."""
-    return (
-        text.replace(" ", "_")
-        .replace("-", "_")
-        .replace("/", "_")
-        .replace("(", "_")
-        .replace(")", "_")
-        .replace(".", "_")
-        .replace("%", "porc")
-        .replace(",", "_")
+    """Sanitize the text.
+
+    The results are cached, as the same labels repeat across trims.
+    """
+    return text.replace("%", "porc").translate(SANITIZE_TABLE)
+
+
+def init_worker(logging_queue: Queue[logging.LogRecord], level: int) -> None:
+    """Send the log records of a worker process to the main process."""
+    logging.basicConfig(
+        level=level,
+        handlers=[logging.handlers.QueueHandler(logging_queue)],
+        force=True,
+    )
+
+
+def is_known_column(name: str, columns: frozenset[str], columns_joined: str) -> bool:
+    """Check if any of the columns includes the name, trying an exact match first.
+
+    The joined columns are separated by NUL, which sanitized names never contain.
+    """
+    return name in columns or name in columns_joined
+
+
+def parse_trim_html(
+    trim_id: int,
+    source: bytes | str,
+    columns: frozenset[str],
+) -> dict[str, str]:
+    """Get the specs and options of a trim from its source, keyed by column.
+
+    The source is passed as stored, so it is also decompressed in the worker.
+    Only plain data goes in and out, so it can run in a worker process. The
+    known columns are only used to recognise sub-rows that are already written.
+    """
+    values: dict[str, str] = {}
+    content_div_class = "mainbar"
+    raw_source = bs4.BeautifulSoup(
+        utils.decompress_html(source),
+        "lxml",
+        parse_only=MAINBAR_STRAINER,
     )
+    # Find both sources in a single traversal
+    mainbars = raw_source.find_all("div", class_=content_div_class, limit=2)
+    source_1 = mainbars[0] if mainbars else None
+    source_2 = mainbars[1] if len(mainbars) > 1 else None
+
+    if source_1 and source_2:
+        # Join the two sources
+        specops_source = source_1
+        # specops_source.append(source_2)
+    elif source_1:
+        specops_source = source_1
+    elif source_2:
+        specops_source = source_2
+    else:
+        specops_source = None
+
+    if (
+        (not source_1 and not source_2)
+        or not specops_source
+        or isinstance(
+            specops_source,
+            NavigableString,
+        )
+    ):
+        reason = (
+            "source_1 and source_2 are None"
+            if not source_1 and not source_2
+            else "specops_source is a NavigableString"
+            if specops_source
+            else "specops_source is None"
+        )
+        logger.info("No source found for trim %s. Reason: %s", trim_id, reason)
+        return values
+
+    # Find all the tables with class "table" in the source
+    tables: ResultSet[Tag] = specops_source.find_all("table", class_="table")
+    if not tables:
+        logger.info("No tables found for trim %s.", trim_id)
+        return values
+
+    # Get the specs and options from the tables
+    columns_joined = "\x00".join(columns)
+    for table in tables:
+        # Find "tr" elements in the table
+        trs: ResultSet[Tag] = table.find_all("tr")
+        # Get "th" and "td" elements from the "tr" elements, by index so the
+        # sub-rows consumed by a "scope=row" title are not visited again
+        i = 0
+        while i < len(trs):
+            tr = trs[i]
+            i += 1
+            th = tr.find("th")
+            td = tr.find("td")
+            td_text = td.get_text(strip=True) if td else ""
+
+            # ! SKIP THIS "tr"
+            if td and SKIP_TRS_PATTERN.search(td_text):
+                reason = f"td contains {SKIP_TRS}"
+                logger.info(
+                    "Skipping tr %s for trim %s. Reason: %s",
+                    sanitize_text(tr.get_text(strip=True)),
+                    trim_id,
+                    reason,
+                )
+                continue
+            if th and isinstance(th, Tag) and td and isinstance(td, Tag):
+                # Remove any inside "span" elements from the "th"
+                spans: ResultSet[Tag] = th.find_all("span")
+                for span in spans:
+                    span.decompose()
+                # Get the text from the "th" and "td" elements
+                th_text = sanitize_text(th.get_text(strip=True))
+                known_columns = {
+                    "Start_and_stop": "Automatismo_de_parada_y_arranque_del_motor",
+                }
+                for key, value in known_columns.items():
+                    if value in th_text:
+                        th_text = key
+                        break
+
+                # Keep the value to write it with the rest of the trim
+                values[th_text] = td_text
+            # If the "th" element has "scope" attribute set to "row"
+            elif th and isinstance(th, Tag) and th.get("scope") == "row":
+                title = sanitize_text(th.get_text(strip=True))
+                # All the following "tr" elements that dont have a "th" are subtitles
+                # The first "td" element inside the "tr" element is the key
+                # The second "td" element inside the "tr" element is the value
+                # The key will be appended to the title with a space in between and then sanitized
+                while i < len(trs):
+                    tr_s = trs[i]
+                    # If "tr" has "th" element, break the loop
+                    if tr_s.find("th"):
+                        break
+                    td_1 = tr_s.find("td")
+                    td_2 = (
+                        td_1.find_next("td") if td_1 and isinstance(td_1, Tag) else None
+                    )
+                    if (
+                        td_1
+                        and td_2
+                        and isinstance(td_1, Tag)
+                        and isinstance(td_2, Tag)
+                    ):
+                        key = sanitize_text(td_1.get_text(strip=True))
+                        value = td_2.get_text(strip=True)
+                        col_name = sanitize_text(f"{title} {key}")
+                        values[col_name] = value
+                    else:
+                        logger.info("No key or value found for trim %s.", trim_id)
+                        break
+                    i += 1
+            elif (
+                td
+                and isinstance(td, Tag)
+                and (
+                    is_known_column(
+                        td_name := sanitize_text(td_text),
+                        columns,
+                        columns_joined,
+                    )
+                    or any(td_name in column for column in values)
+                )
+            ):
+                # If there is a column that includes the text of the "td" element
+                # Means that it is already written to the database
+                pass
+            else:
+                logger.info("No th or td found for trim %s.", trim_id)
+                logger.info("th: %s", th.get_text(strip=True)) if th else None
+                logger.info("td: %s", td_text) if td else None
+
+    return values
 
 
 async def prompt_new_column(
     db: aiosqlite.Connection,
     column_name: str,
+    columns: set[str],
     answer: str | None = None,
 ) -> None:
-    """Prompt the user to add a new column to the trims table."""
+    """Prompt the user to add a new column to the trims table.
+
+    The column is added to the given set of known columns if it is created.
+    """
     if not answer:
         add_column = input(
             f"Add column '{column_name}' to the trims table? (Y/n): ",
@@ -47,194 +265,236 @@ async def prompt_new_column(
         f"ALTER TABLE trims ADD COLUMN {column_name} TEXT",
     )
     await db.commit()
+    columns.add(column_name)
+
+
+def hash_source(source: bytes | str) -> bytes:
+    """Hash a trim's stored source, along with the parser version, to tell if it must be parsed again."""
+    digest = hashlib.blake2b(PARSER_VERSION.to_bytes(4, "big"), digest_size=16)
+    digest.update(source.encode() if isinstance(source, str) else source)
+    return digest.digest()
+
+
+async def read_trims(
+    reader: aiosqlite.Connection,
+    queue: asyncio.Queue[QueuedTrim | None],
+    p_bar: tqdm,
+) -> None:
+    """Queue the trims whose source changed since it was last parsed."""
+    async with reader.execute(
+        """
+        SELECT trims.id, trims.children_source, trim_parsed.html_hash
+        FROM trims
+        LEFT JOIN trim_parsed ON trim_parsed.id = trims.id
+        WHERE trims.children_source IS NOT NULL
+        ORDER BY trims.id
+        """,
+    ) as cursor:
+        while trims := await cursor.fetchmany(BATCH_SIZE):
+            for trim_id, source, parsed_hash in trims:
+                # Skip the trims whose values are already written
+                html_hash = hash_source(source)
+                if html_hash == parsed_hash:
+                    p_bar.update(1)
+                    continue
+                await queue.put((trim_id, source, html_hash))
+
+    # Tell every parser that there are no more trims
+    for _ in range(PARSER_COUNT):
+        await queue.put(None)
+
+
+async def parse_trims(
+    executor: ProcessPoolExecutor,
+    columns: set[str],
+    in_queue: asyncio.Queue[QueuedTrim | None],
+    out_queue: asyncio.Queue[ParsedTrim | None],
+) -> None:
+    """Parse the trims from the queue in the executor until it gets None."""
+    loop = asyncio.get_running_loop()
+    while (trim := await in_queue.get()) is not None:
+        trim_id, source, html_hash = trim
+        try:
+            values = await loop.run_in_executor(
+                executor,
+                parse_trim_html,
+                trim_id,
+                source,
+                frozenset(columns),
+            )
+        except Exception:
+            logger.exception("Error parsing trim %s", trim_id)
+            continue
+        await out_queue.put((trim_id, html_hash, values))
+
+
+@functools.lru_cache(maxsize=1024)
+def build_update_sql(columns: tuple[str, ...]) -> str:
+    """Build the UPDATE statement of the given trims columns.
+
+    The same statement text is returned for the same columns, so SQLite's
+    statement cache can reuse its compiled form.
+    """
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    return f"UPDATE trims SET {assignments} WHERE id = ?"  # nosec # noqa: S608
+
+
+async def write_trims(
+    db: aiosqlite.Connection,
+    trims: list[ParsedTrim],
+    columns: set[str],
+) -> None:
+    """Write a batch of parsed trims to the database in a single transaction."""
+    # Group the updates by their columns, so each group is a single statement
+    updates: dict[tuple[str, ...], list[tuple[str | int, ...]]] = defaultdict(list)
+    new_parsed: list[tuple[int, bytes]] = []
+    # The trims with a column that could not be added are parsed again on the next run
+    failed: set[int] = set()
+    unavailable: set[str] = set()
+    for trim_id, html_hash, values in trims:
+        for column in values:
+            if column in unavailable:
+                failed.add(trim_id)
+            # Check if there exists a column with this name in the trims table
+            elif column not in columns:
+                logger.info("Column %s not found in trims table. Prompting...", column)
+                try:
+                    await prompt_new_column(db, column, columns, "y")
+                except aiosqlite.Error:
+                    # e.g. a name that only differs in case from an existing column
+                    logger.exception(
+                        "Error adding column %s to the trims table",
+                        column,
+                    )
+                    unavailable.add(column)
+                    failed.add(trim_id)
+        # Only write the columns that exist in the trims table
+        known_values = {
+            column: value for column, value in values.items() if column in columns
+        }
+        if known_values:
+            updates[tuple(known_values)].append((*known_values.values(), trim_id))
+        new_parsed.append((trim_id, html_hash))
+
+    # Open the transaction explicitly, so releasing a savepoint does not commit
+    async with db.cursor() as cursor:
+        await cursor.execute("BEGIN")
+        for trim_columns, rows in updates.items():
+            # Only roll back the trims of a failed statement, not the whole batch
+            await cursor.execute("SAVEPOINT trims_update")
+            try:
+                await cursor.executemany(build_update_sql(trim_columns), rows)
+            except aiosqlite.Error:
+                logger.exception("Error writing trims %s", [row[-1] for row in rows])
+                await cursor.execute("ROLLBACK TO trims_update")
+                failed.update(row[-1] for row in rows)
+            await cursor.execute("RELEASE trims_update")
+
+        # Store the hash of the parsed trims' source, in the same transaction as
+        # their values are written. The failed trims are left out, so they are
+        # parsed again on the next run
+        if new_parsed := [row for row in new_parsed if row[0] not in failed]:
+            await cursor.executemany(
+                "INSERT OR REPLACE INTO trim_parsed (id, html_hash) VALUES (?, ?)",
+                new_parsed,
+            )
+    await db.commit()
+
+
+async def drain_trims(
+    db: aiosqlite.Connection,
+    columns: set[str],
+    queue: asyncio.Queue[ParsedTrim | None],
+    p_bar: tqdm,
+) -> None:
+    """Write the parsed trims from the queue to the database until it gets None."""
+    pending: list[ParsedTrim] = []
+    while (trim := await queue.get()) is not None:
+        pending.append(trim)
+        p_bar.update(1)
+        if len(pending) >= COMMIT_SIZE:
+            await write_trims(db, pending, columns)
+            pending.clear()
+
+    # Write the remaining trims
+    if pending:
+        await write_trims(db, pending, columns)
 
 
 async def main(
     db: aiosqlite.Connection,
+    reader: aiosqlite.Connection,
+    executor: ProcessPoolExecutor,
 ) -> None:
-    """Filter the database according to various parameters."""
+    """Filter the database according to various parameters.
+
+    The trims are read through the reader connection, so the long-running
+    SELECT does not share the connection the updates are written to. Their
+    sources are parsed in the executor's processes, outside of the GIL, while
+    the parsed trims are written. The trims whose source has not changed since
+    it was last parsed are skipped.
+    """
     logger.info("Connected to the database.")
 
-    # Get trims table number of rows
-    trims_count = next(iter(await db.execute_fetchall("SELECT COUNT(*) FROM trims")))
+    # Create the table of the parsed trims, skipped while their source is unchanged
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS trim_parsed (
+            id INTEGER PRIMARY KEY,
+            html_hash BLOB NOT NULL,
+            FOREIGN KEY (id) REFERENCES trims (id)
+        )
+        """,
+    )
+    await db.commit()
+
+    # Get the number of trims with a source
+    trims_count = next(
+        iter(
+            await db.execute_fetchall(
+                "SELECT COUNT(*) FROM trims WHERE children_source IS NOT NULL",
+            ),
+        ),
+    )
     trims_count = trims_count[0]
     logger.info("Trims count: %s", trims_count)
 
-    # Get the specs and options for each trim
+    # Get the columns of the trims table, kept up to date as columns are added
+    columns = {
+        column[1] for column in await db.execute_fetchall("PRAGMA table_info(trims)")
+    }
+
+    # Get the specs and options for each trim, reading, parsing and writing
+    # them at the same time
     logger.info("Getting the specs and options for each trim...")
-    content_div_class = "mainbar"
-    for trim_id in tqdm(range(trims_count)):
-        trim = next(
-            iter(
-                await db.execute_fetchall(
-                    "SELECT * FROM trims WHERE id = ?",
-                    (trim_id + 1,),
-                ),
+    trim_queue: asyncio.Queue[QueuedTrim | None] = asyncio.Queue(QUEUE_SIZE)
+    parsed_queue: asyncio.Queue[ParsedTrim | None] = asyncio.Queue(QUEUE_SIZE)
+    p_bar = tqdm(total=trims_count)
+    # If any task fails the others are cancelled, so the parsers do not wait
+    # forever on the queue of a writer that is gone
+    async with asyncio.TaskGroup() as group:
+        group.create_task(drain_trims(db, columns, parsed_queue, p_bar))
+        await asyncio.gather(
+            group.create_task(read_trims(reader, trim_queue, p_bar)),
+            *(
+                group.create_task(
+                    parse_trims(executor, columns, trim_queue, parsed_queue),
+                )
+                for _ in range(PARSER_COUNT)
             ),
         )
-        raw_source = bs4.BeautifulSoup(trim[4], "html.parser")
-        source_1 = raw_source.find("div", class_=content_div_class)
-        if source_1:
-            source_2 = source_1.find_next("div", class_=content_div_class)
-        else:
-            source_2 = None
-
-        if source_1 and source_2:
-            # Join the two sources
-            specops_source = source_1
-            # specops_source.append(source_2)
-        elif source_1:
-            specops_source = source_1
-        elif source_2:
-            specops_source = source_2
-        else:
-            specops_source = None
-
-        if (
-            (not source_1 and not source_2)
-            or not specops_source
-            or isinstance(
-                specops_source,
-                NavigableString,
-            )
-        ):
-            reason = (
-                "source_1 and source_2 are None"
-                if not source_1 and not source_2
-                else "specops_source is a NavigableString"
-                if specops_source
-                else "specops_source is None"
-            )
-            logger.info("No source found for trim %s. Reason: %s", trim[0], reason)
-            continue
 
-        # Find all the tables with class "table" in the source
-        tables: ResultSet[Tag] = specops_source.find_all("table", class_="table")
-        if not tables:
-            logger.info("No tables found for trim %s.", trim[0])
-            continue
-
-        # Get the specs and options from the tables
-        for table in tables:
-            # Find "tr" elements in the table
-            trs: ResultSet[Tag] = table.find_all("tr")
-            # Get "th" and "td" elements from the "tr" elements
-            for tr in trs:
-                th = tr.find("th")
-                td = tr.find("td")
-
-                # ! SKIP THIS "tr"
-                skip_trs = [
-                    "Sólo en paquete",
-                    # "€",
-                ]
-                if td and any(
-                    skip_tr in td.get_text(strip=True) for skip_tr in skip_trs
-                ):
-                    reason = f"td contains {skip_trs}"
-                    logger.info(
-                        "Skipping tr %s for trim %s. Reason: %s",
-                        sanitize_text(tr.get_text(strip=True)),
-                        trim[0],
-                        reason,
-                    )
-                    continue
-                column_exists = await db.execute_fetchall(
-                    "PRAGMA table_info(trims)",
-                )
-                column_exists = list(column_exists)
-                if th and isinstance(th, Tag) and td and isinstance(td, Tag):
-                    # Remove any inside "span" elements from the "th"
-                    spans: ResultSet[Tag] = th.find_all("span")
-                    for span in spans:
-                        span.decompose()
-                    # Get the text from the "th" and "td" elements
-                    th_text = sanitize_text(th.get_text(strip=True))
-                    td_text = td.get_text(strip=True)
-                    known_columns = {
-                        "Start_and_stop": "Automatismo_de_parada_y_arranque_del_motor",
-                    }
-                    for key, value in known_columns.items():
-                        if value in th_text:
-                            th_text = key
-                            break
-
-                    # Check if there exists a column with the name of the "th" text in the trims table
-                    if all(column[1] != th_text for column in column_exists):
-                        logger.info(
-                            "Column %s not found in trims table. Prompting...",
-                            th_text,
-                        )
-                        await prompt_new_column(db, th_text, "y")
-
-                    # Write the specs and options to the database
-                    await db.execute(
-                        f"UPDATE trims SET {th_text} = ? WHERE id = ?",  # nosec # noqa: S608
-                        (td_text, trim[0]),
-                    )
-                    await db.commit()
-                # If the "th" element has "scope" attribute set to "row"
-                elif th and isinstance(th, Tag) and th.get("scope") == "row":
-                    title = sanitize_text(th.get_text(strip=True))
-                    # All the following "tr" elements that dont have a "th" are subtitles
-                    # The first "td" element inside the "tr" element is the key
-                    # The second "td" element inside the "tr" element is the value
-                    # The key will be appended to the title with a space in between and then sanitized
-                    while True:
-                        tr_s = tr.find_next("tr")
-                        if not tr_s:
-                            break
-                        # If "tr" has "th" element, break the loop
-                        if tr_s.find("th"):
-                            break
-                        td_1 = tr_s.find("td")
-                        td_2 = (
-                            td_1.find_next("td")
-                            if td_1 and isinstance(td_1, Tag)
-                            else None
-                        )
-                        if (
-                            td_1
-                            and td_2
-                            and isinstance(td_1, Tag)
-                            and isinstance(td_2, Tag)
-                        ):
-                            key = sanitize_text(td_1.get_text(strip=True))
-                            value = td_2.get_text(strip=True)
-                            col_name = sanitize_text(f"{title} {key}")
-                            if col_name not in [column[1] for column in column_exists]:
-                                await prompt_new_column(db, col_name, "y")
-                            await db.execute(
-                                f"UPDATE trims SET {col_name} = ? WHERE id = ?",  # nosec # noqa: S608
-                                (value, trim[0]),
-                            )
-                            await db.commit()
-                        else:
-                            logger.info("No key or value found for trim %s.", trim[0])
-                            break
-                        tr = tr_s
-                elif (
-                    td
-                    and isinstance(td, Tag)
-                    and any(
-                        sanitize_text(td.get_text(strip=True)) in col[1]
-                        for col in column_exists
-                    )
-                ):
-                    # If there is a column that includes the text of the "td" element
-                    # Means that it is already written to the database
-                    pass
-                else:
-                    logger.info("No th or td found for trim %s.", trim[0])
-                    logger.info("th: %s", th.get_text(strip=True)) if th else None
-                    logger.info("td: %s", td.get_text(strip=True)) if td else None
-
-        # Commit the changes to the database
-        await db.commit()
+        # Let the writer write the remaining trims
+        await parsed_queue.put(None)
+    p_bar.close()
     logger.info("Finished updating the database.")
 
 
 if __name__ == "__main__":
+    # Use uvloop as the event loop when it is available
+    if uvloop is not None:
+        uvloop.install()
+
     # Set up the logger
     file_handler = logging.FileHandler("km77.log", mode="w", encoding="utf-8")
     file_handler.setLevel(logging.DEBUG)
@@ -242,36 +502,51 @@ if __name__ == "__main__":
     stream_handler.setLevel(logging.INFO)
     stream_handler.setFormatter(utils.CustomFormatter("%(message)s"))
 
-    logging_queue = SimpleQueue()  # type: ignore[assignment]
-    queue_handler = logging.handlers.QueueHandler(logging_queue)  # type: ignore[arg-type]
+    # The worker processes are spawned rather than forked, as forking would copy
+    # the state of the aiosqlite and logging threads already running
+    mp_context = multiprocessing.get_context("spawn")
+
+    # The worker processes log to the same queue, so it must be process-safe
+    logging_queue = mp_context.Queue()  # type: ignore[var-annotated]
+    queue_handler = logging.handlers.QueueHandler(logging_queue)
     listener = logging.handlers.QueueListener(
-        logging_queue,  # type: ignore[arg-type]
+        logging_queue,
         file_handler,
         stream_handler,
         respect_handler_level=True,
     )
 
+    # Only log debug messages when requested, as they are emitted in hot loops
     logging.basicConfig(
-        level=logging.NOTSET,
+        level=logging.DEBUG if os.environ.get("LOG_DEBUG") else logging.INFO,
         handlers=[queue_handler],
         encoding="utf-8",
     )
 
-    logger = logging.getLogger(__name__)
     logging.getLogger("aiosqlite").setLevel(logging.INFO)
 
     # Clear the console
     utils.clear_console()
     db = asyncio.new_event_loop().run_until_complete(
-        aiosqlite.connect(utils.DATABASE_FILE_PATH),
+        utils.connect_database(),
+    )
+    reader = asyncio.new_event_loop().run_until_complete(
+        utils.connect_database(),
+    )
+    executor = ProcessPoolExecutor(
+        mp_context=mp_context,
+        initializer=init_worker,
+        initargs=(logging_queue, logging.getLogger().level),
     )
     try:
         listener.start()
         atexit.register(listener.stop)
-        asyncio.run(main(db))
+        asyncio.run(main(db, reader, executor))
     except (RuntimeError, KeyboardInterrupt):
         listener.stop()
         logger.info("Exiting...")
     finally:
+        executor.shutdown(cancel_futures=True)
+        asyncio.run(reader.close())
         asyncio.run(db.close())
-exit()
+    sys.exit()
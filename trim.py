@@ -4,10 +4,10 @@
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, ClassVar
 
 if TYPE_CHECKING:
-    from bs4 import ResultSet, Tag
+    from bs4 import ResultSet, SoupStrainer, Tag
 
     import model
 
@@ -17,6 +17,12 @@ logger = logging.getLogger(__name__)
 class Trim:
     """Trim class for car trims."""
 
+    # Table the trims are stored in
+    TABLE: ClassVar[str] = "trims"
+
+    # The whole trim source is needed for the specs, options and sort_db.py
+    CHILDREN_STRAINER: ClassVar[SoupStrainer | None] = None
+
     def __init__(
         self: Trim,
         ident: int,
@@ -40,15 +46,22 @@ class Trim:
         """Return the Trim's name."""
         return self.name
 
-    async def get_specops(
-        self: Trim,
-    ) -> None:
-        """Get the data for a given trim."""
-        if self.specs and self.options:
-            return
+    def to_row(self: Trim) -> tuple[int, int, str, str]:
+        """Return the Trim's row for utils.INSERT_SQL."""
+        return (self.id, self.model.id, self.name, self.children_url)
+
+    def get_specops(self: Trim) -> bool:
+        """Get the data for a given trim.
+
+        Return whether new specs or options were parsed, which must be stored.
+        """
+        # Either list is enough, as some trims have no options, and parsing them
+        # again would append the specs on top of the ones loaded from the database
+        if self.specs or self.options:
+            return False
         if not self.children_source:
             logger.error("No source found for %s", self.name)
-            return
+            return False
         # Get the specs and options.
         # The specs tables are inside a "div" with the id "measurements-1"
         # The options tables are inside a "div" with the id "features-2"
@@ -93,7 +106,10 @@ class Trim:
                 last_pseudo_key = None
                 num_tds = 3
                 for row in rows:
-                    tds = row.find_all("td")
+                    # Look the cells up once, they are used by every branch.
+                    # They are always direct children of the row, so only those are searched
+                    th = row.find("th", recursive=False)
+                    tds = row.find_all("td", recursive=False)
                     if len(tds) == num_tds:
                         # This is a special case where the row has 3 "td" elements
                         # The first "td" is the package name, the second "td" is the price, and the third "td" is the checkbox
@@ -110,33 +126,33 @@ class Trim:
                             "price": price,
                             "addons": addons,
                         }
-                    elif row.find("td") is None:
-                        last_pseudo_key = row.find("th").text
+                    elif not tds:
+                        last_pseudo_key = th.text
                         if "\n" in last_pseudo_key:
                             last_pseudo_key = last_pseudo_key.split("\n")[1].strip()
                         data[last_pseudo_key] = {}
-                    elif row.find("th") is None:
+                    elif th is None:
                         # This is a special case where the row does not have a "th" and a "td"
                         # but only 2 "td" elements
                         # The first "td" is the key and the second "td" is the value
-                        key = row.find_all("td")[0].text
+                        key = tds[0].text
                         if "\n" in key:
                             key = key.split("\n")[1].strip()
-                        value = row.find_all("td")[1].text
+                        value = tds[1].text
                         if "\n" in value:
                             value = value.split("\n")[1].strip()
                         data[last_pseudo_key][key] = value
 
                     else:
-                        key = row.find("th").text.split("\n")[1].strip()
+                        key = th.text.split("\n")[1].strip()
                         value = (
                             (
-                                row.find("td", class_="text-right")
+                                row.find("td", class_="text-right", recursive=False)
                                 .text.split("\n")[1]
                                 .strip()
                             )
                             if "Distintivo ambiental" not in key
-                            else row.find("td").find("img")["alt"]
+                            else tds[0].find("img")["alt"]
                         )
 
                         data[key] = value
@@ -145,3 +161,5 @@ class Trim:
                     self.specs.append({"caption": caption, "data": data})
                 else:
                     self.options.append({"caption": caption, "data": data})
+
+        return bool(self.specs or self.options)
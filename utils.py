@@ -3,17 +3,23 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
-import subprocess  # nosec
+import sys
 import typing
+from collections import defaultdict
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 import aiohttp
+import aiosqlite
 import bs4
 import colored
+import orjson
+import zstandard
 from tqdm import tqdm
+from tqdm.asyncio import tqdm_asyncio
 
 from make import Make
 from model import Model
@@ -22,102 +28,168 @@ from trim import Trim
 if TYPE_CHECKING:
     from collections.abc import Sequence
 
-    import aiosqlite
-
 # Set up the logger
 logger = logging.getLogger(__name__)
 
 DATABASE_FILE_NAME = "km77.db"
 DATABASE_FILE_PATH = Path.joinpath(Path(__file__).parent, DATABASE_FILE_NAME)
 BASE_URL = "https://www.km77.com"
+# Compression level of the page sources stored in the database
+ZSTD_LEVEL = 3
+# Number of trims whose specs and options are stored per transaction
+SPECOPS_BATCH_SIZE = 100
 
 
 class CustomFormatter(logging.Formatter):
     """Custom formatter to remove the logger name from the log messages."""
 
+    # The escape sequences are built once, rather than for every record
     COLORS: typing.ClassVar = {
-        "DEBUG": colored.fg("blue"),
-        "INFO": "",
-        "WARNING": colored.fg("yellow"),
-        "ERROR": colored.fg("red"),
-        "CRITICAL": colored.fg("red"),
+        logging.DEBUG: colored.fg("blue"),
+        logging.INFO: "",
+        logging.WARNING: colored.fg("yellow"),
+        logging.ERROR: colored.fg("red"),
+        logging.CRITICAL: colored.fg("red"),
     }
+    RESET: typing.ClassVar = colored.attr("reset")
 
     def format(self: CustomFormatter, record: logging.LogRecord) -> str:
         """Format the log message."""
-        levelname = record.levelname
-        color = self.COLORS.get(levelname, "")
-        return f"{color}{record.getMessage()}{colored.attr('reset')}"
+        color = self.COLORS.get(record.levelno, "")
+        return f"{color}{record.getMessage()}{self.RESET}"
+
+
+# Enable the ANSI escape sequences in the Windows console
+if os.name == "nt":
+    os.system("")  # nosec # noqa: S605, S607
+
+# Erase the screen and move the cursor to the top left corner
+CLEAR_SEQUENCE = "\x1b[2J\x1b[H"
+# Start and end the bold headings
+BOLD = "\033[1m"
+BOLD_END = "\033[0m"
 
 
 def clear_console() -> None:
     """Clear the console."""
-    if os.name == "nt":
-        subprocess.run("cls", shell=True, check=False)  # nosec # noqa: S607, S602
-    else:
-        subprocess.run("clear", shell=True, check=False)  # nosec # noqa: S607, S602
+    sys.stdout.write(CLEAR_SEQUENCE)
+    sys.stdout.flush()
+
+
+async def tune_connection(db: aiosqlite.Connection) -> None:
+    """Configure the connection for faster writes."""
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await db.execute("PRAGMA temp_store=MEMORY")
+    await db.execute("PRAGMA cache_size=-64000")
+    # Read the database through a memory map of up to 256 MiB
+    await db.execute("PRAGMA mmap_size=268435456")
+    await db.commit()
+
+
+async def connect_database() -> aiosqlite.Connection:
+    """Open a tuned connection to the database.
+
+    Each script opens its connections once and passes them through, so the
+    PRAGMAs only run once per connection. The default isolation level is kept,
+    as the writes are batched into the transactions sqlite3 opens implicitly.
+    """
+    db = await aiosqlite.connect(DATABASE_FILE_PATH)
+    await tune_connection(db)
+    return db
+
+
+# Statements getting the highest id of each table
+NEXT_ID_SQL = {
+    "makes": "SELECT MAX(id) FROM makes",
+    "models": "SELECT MAX(id) FROM models",
+    "trims": "SELECT MAX(id) FROM trims",
+}
 
 
 async def get_next_id(table: str, db: aiosqlite.Connection) -> int:
     """Get the next id for a given table."""
     try:
-        cursor = await db.execute(f"SELECT MAX(id) FROM {table}")  # noqa: S608 # nosec
-        max_id = await cursor.fetchone()
+        max_id = next(iter(await db.execute_fetchall(NEXT_ID_SQL[table])))
     except Exception:
         logger.exception("Error getting the next id for %s", table)
         return 1
     return max_id[0] + 1 if max_id[0] else 1  # type: ignore[]
 
 
+# Statements inserting a row into each table, with the id given by get_next_id
+INSERT_SQL = {
+    "makes": "INSERT OR IGNORE INTO makes (id, name, url) VALUES (?, ?, ?)",
+    "models": "INSERT OR IGNORE INTO models (id, make_id, name, url) VALUES (?, ?, ?, ?)",
+    "trims": "INSERT OR IGNORE INTO trims (id, model_id, name, url) VALUES (?, ?, ?, ?)",
+}
+# Number of rows written to the database per transaction
+WRITE_BATCH_SIZE = 500
+# Minimum number of seconds between two redraws of a progress bar
+PROGRESS_MININTERVAL = 0.5
+
+
 async def insert_into_database(
-    obj: Make | Model | Trim,
+    objs: Sequence[Make | Model | Trim],
     table: str,
     db: aiosqlite.Connection,
 ) -> None:
-    """Insert a make, model or trim into the database."""
+    """Insert makes, models or trims into the database, in batches of WRITE_BATCH_SIZE."""
+    rows: list[tuple[int | str, ...]] = []
+    sources: list[tuple[bytes | str, int]] = []
+    for obj in objs:
+        if table != obj.TABLE:
+            continue
+        logger.debug("Inserting %s into the database.", obj.name)
+        rows.append(obj.to_row())
+        if obj.children_source is not None:
+            sources.append((str(obj.children_source), obj.id))
+
     try:
-        if table == "makes" and isinstance(obj, Make):
-            logger.debug("Inserting %s into the database.", obj.name)
-            await db.execute(
-                "INSERT OR IGNORE INTO makes (name, url) VALUES (?, ?)",
-                (obj.name, obj.children_url),
-            )
-            if obj.children_source is not None:
-                await db.execute(
-                    "UPDATE makes SET children_source = ? WHERE id = ?",
-                    (str(obj.children_source), obj.id),
+        for start in range(0, len(rows), WRITE_BATCH_SIZE):
+            async with db.cursor() as cursor:
+                await cursor.executemany(
+                    INSERT_SQL[table],
+                    rows[start : start + WRITE_BATCH_SIZE],
                 )
-        elif table == "models" and isinstance(obj, Model):
-            logger.debug("Inserting %s into the database.", obj.name)
-            await db.execute(
-                "INSERT OR IGNORE INTO models (make_id, name, url) VALUES (?, ?, ?)",
-                (obj.make.id, obj.name, obj.children_url),
-            )
-            if obj.children_source is not None:
-                await db.execute(
-                    "UPDATE models SET children_source = ? WHERE id = ?",
-                    (str(obj.children_source), obj.id),
-                )
-        elif table == "trims" and isinstance(obj, Trim):
-            logger.debug("Inserting %s into the database.", obj.name)
-            await db.execute(
-                "INSERT OR IGNORE INTO trims (name, url, model_id) VALUES (?, ?, ?)",
-                (obj.name, obj.children_url, obj.model.id),
-            )
-            if obj.children_source is not None:
-                await db.execute(
-                    "UPDATE trims SET children_source = ? WHERE id = ?",
-                    (str(obj.children_source), obj.id),
-                )
-        logger.debug("Committing the changes to the database.")
-        await db.commit()
+            logger.debug("Committing the changes to the database.")
+            await db.commit()
+        if sources:
+            await write_children_sources(table, sources, db)
+    except Exception:
+        logger.exception("Error inserting the %s into the database:", table)
+
 
-    except Exception as e:
-        logger.exception("Error inserting %s into the database:", obj.name)
-        if "UNIQUE constraint failed" in str(e):
-            logger.warning("The %s %s is already in the database.", table, obj.name)
-            # Continue with the next object
-            return
+def compress_html(html: bytes | str) -> bytes:
+    """Compress a page source to store it in the database."""
+    if isinstance(html, str):
+        html = html.encode()
+    return zstandard.compress(html, ZSTD_LEVEL)
+
+
+def decompress_html(source: bytes | str) -> bytes | str:
+    """Decompress a page source stored in the database.
+
+    The page is returned as bytes, so lxml decodes it with its declared charset.
+    Sources stored before they were compressed are returned as they are.
+    """
+    if isinstance(source, str):
+        return source
+    return zstandard.decompress(source)
+
+
+async def write_children_sources(
+    table: str,
+    rows: list[tuple[bytes | str, int]],
+    db: aiosqlite.Connection,
+) -> None:
+    """Write the children sources of a table's rows in a single transaction."""
+    async with db.cursor() as cursor:
+        await cursor.executemany(
+            f"UPDATE {table} SET children_source = ? WHERE id = ?",  # nosec # noqa: S608
+            [(compress_html(html), ident) for html, ident in rows],
+        )
+    await db.commit()
 
 
 async def load_database(
@@ -131,7 +203,7 @@ async def load_database(
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
             url TEXT NOT NULL,
-            children_source TEXT,
+            children_source BLOB,
             UNIQUE (name, url)
         )
         """,
@@ -143,7 +215,7 @@ async def load_database(
             make_id INTEGER NOT NULL,
             name TEXT NOT NULL,
             url TEXT NOT NULL,
-            children_source TEXT,
+            children_source BLOB,
             FOREIGN KEY (make_id) REFERENCES makes (id),
             UNIQUE (make_id, name, url)
         )
@@ -156,29 +228,72 @@ async def load_database(
             model_id INTEGER NOT NULL,
             name TEXT NOT NULL,
             url TEXT NOT NULL,
-            children_source TEXT,
+            children_source BLOB,
             FOREIGN KEY (model_id) REFERENCES models (id),
             UNIQUE (model_id, name, url)
         )
         """,
     )
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS specops (
+            trim_id INTEGER PRIMARY KEY,
+            specs BLOB NOT NULL,
+            options BLOB NOT NULL,
+            FOREIGN KEY (trim_id) REFERENCES trims (id)
+        )
+        """,
+    )
+    # The lookups by make_id and model_id are already covered by the UNIQUE
+    # indexes. This one lets get_trims_source.py find the trims without a
+    # source without scanning their sources
+    await db.execute(
+        """
+        CREATE INDEX IF NOT EXISTS trims_without_source
+        ON trims (id) WHERE children_source IS NULL
+        """,
+    )
     await db.commit()
 
     makes: list[Make] = []
     try:
         logger.debug("Getting the makes from the database.")
-        makes_in_db = await db.execute_fetchall("SELECT * FROM makes")
+        makes_in_db = await db.execute_fetchall(
+            "SELECT id, name, url, children_source FROM makes",
+        )
     except Exception:
         logger.exception("Error getting the makes from the database.")
         return makes
     logger.debug("Loading the makes from the database.")
-    # Get the total number of trims
-    n_trims = await db.execute("SELECT COUNT(*) FROM trims")
-    n_trims = await n_trims.fetchone()
+    # Get the parsed specs and options of the trims
+    specops = {
+        row[0]: (row[1], row[2])
+        for row in await db.execute_fetchall(
+            "SELECT trim_id, specs, options FROM specops",
+        )
+    }
+    # Get all the models and trims at once, grouped by their parent's id
+    models_by_make: dict[int, list[tuple[int, str, str, bytes | str | None]]] = (
+        defaultdict(list)
+    )
+    for model_row in await db.execute_fetchall(
+        "SELECT make_id, id, name, url, children_source FROM models ORDER BY id",
+    ):
+        models_by_make[model_row[0]].append(model_row[1:])
+    trims_by_model: dict[int, list[tuple[int, str, str, bytes | str | None]]] = (
+        defaultdict(list)
+    )
+    n_trims = 0
+    for trim_row in await db.execute_fetchall(
+        "SELECT model_id, id, name, url, children_source FROM trims ORDER BY id",
+    ):
+        trims_by_model[trim_row[0]].append(trim_row[1:])
+        n_trims += 1
     p_bar = tqdm(
-        total=n_trims[0],
+        total=n_trims,
         desc="Loading the database",
         smoothing=0,
+        mininterval=PROGRESS_MININTERVAL,
         unit=" trims",
     )
     for make_row in makes_in_db:
@@ -188,125 +303,229 @@ async def load_database(
             children_url=make_row[2],
         )
         if make_row[3]:
-            make_obj.children_source = bs4.BeautifulSoup(make_row[3], "html.parser")
-        for model_row in await db.execute_fetchall(
-            "SELECT * FROM models WHERE make_id = ?",
-            (make_obj.id,),
-        ):
+            make_obj.children_source = parse_html(
+                decompress_html(make_row[3]),
+                Make.CHILDREN_STRAINER,
+            )
+        for model_row in models_by_make[make_obj.id]:
             model_obj = Model(
                 ident=model_row[0],
-                name=model_row[2],
-                children_url=model_row[3],
+                name=model_row[1],
+                children_url=model_row[2],
                 make=make_obj,
             )
-            if model_row[4]:
-                model_obj.children_source = bs4.BeautifulSoup(
-                    model_row[4],
-                    "html.parser",
+            if model_row[3]:
+                model_obj.children_source = parse_html(
+                    decompress_html(model_row[3]),
+                    Model.CHILDREN_STRAINER,
                 )
             make_obj.add_model(model_obj)
-            for trim_row in await db.execute_fetchall(
-                "SELECT * FROM trims WHERE model_id = ?",
-                (model_obj.id,),
-            ):
+            trim_rows = trims_by_model[model_obj.id]
+            for trim_row in trim_rows:
                 trim_obj = Trim(
                     ident=trim_row[0],
-                    name=trim_row[2],
-                    children_url=trim_row[3],
+                    name=trim_row[1],
+                    children_url=trim_row[2],
                     model=model_obj,
                 )
-                if trim_row[4]:
-                    trim_obj.children_source = bs4.BeautifulSoup(
-                        trim_row[4],
-                        "html.parser",
+                if trim_row[3]:
+                    trim_obj.children_source = parse_html(
+                        decompress_html(trim_row[3]),
                     )
+                if trim_row[0] in specops:
+                    trim_obj.specs = orjson.loads(specops[trim_row[0]][0])
+                    trim_obj.options = orjson.loads(specops[trim_row[0]][1])
                 model_obj.add_trim(trim_obj)
-                p_bar.update(1)
+            # Advance the bar once per model rather than once per trim
+            p_bar.update(len(trim_rows))
         makes.append(make_obj)
     p_bar.close()
     return makes
 
 
 AIOHTTP_MAX_SIZE = 8192 * 3
+# Maximum number of sources to fetch at the same time, one per connection to km77
+MAX_CONCURRENT_REQUESTS = 20
+# Number of children sources written to the database per transaction
+SOURCES_BATCH_SIZE = 50
+# The parent and child labels of each class, used in the progress messages
+CHILDREN_LABELS: dict[type[Make | Model | Trim], tuple[str, str]] = {
+    Make: ("Make", "Model"),
+    Model: ("Model", "Trim"),
+    Trim: ("Trim", "SpecOp"),
+}
+
+# Shared by every request, so the connections to km77 are kept alive and reused
+_session: aiohttp.ClientSession | None = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Get the shared client session, creating it on first use."""
+    global _session  # noqa: PLW0603
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=20,
+                keepalive_timeout=75,
+                ttl_dns_cache=300,
+            ),
+            max_field_size=AIOHTTP_MAX_SIZE,
+            max_line_size=AIOHTTP_MAX_SIZE,
+        )
+    return _session
 
 
-async def get_source(
-    url: str,
-) -> bs4.BeautifulSoup:
-    """Get the source of a page. Returns a BeautifulSoup object."""
+async def close_session() -> None:
+    """Close the shared client session, if it was created."""
+    global _session  # noqa: PLW0603
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+async def fetch_html(url: str) -> bytes:
+    """Get the raw source of a page, as it is stored in the database.
+
+    The body is kept as bytes, as both lxml and zstandard take them as they are.
+    """
     try:
-        async with aiohttp.ClientSession(
-            max_field_size=AIOHTTP_MAX_SIZE,
-            max_line_size=AIOHTTP_MAX_SIZE,
-        ) as session:
-            logger.debug("Getting the source for %s", url)
-            html = await session.get(url)
-            source = await html.text()
+        logger.debug("Getting the source for %s", url)
+        async with get_session().get(url) as html:
+            return await html.read()
     except aiohttp.TooManyRedirects:
         logger.exception("Too many redirects for %s.", url)
-        source = ""
-    return bs4.BeautifulSoup(source, "html.parser")
+        return b""
 
 
-async def get_children_sources(
-    parents_list: Sequence[Make | Model | Trim],
-    db: aiosqlite.Connection,
-) -> None:
-    """Get the source code for each object in the list and process it."""
-    parent = (
-        "Make"
-        if isinstance(parents_list[0], Make)
-        else "Model"
-        if isinstance(parents_list[0], Model)
-        else "Trim"
-    )
-    child = (
-        "Model"
-        if isinstance(parents_list[0], Make)
-        else "Trim"
-        if isinstance(parents_list[0], Model)
-        else "SpecOp"
-    )
-    bold = "\033[1m"
-    reset = "\033[0m"
-    h2 = f"{bold}Getting the {child}s for each {parent}.{reset}"
-    logger.info(h2)
-    for obj in tqdm(parents_list, desc=f"Getting {child}s sources", smoothing=0):
+def parse_html(
+    html: bytes | str,
+    parse_only: bs4.SoupStrainer | None = None,
+) -> bs4.BeautifulSoup:
+    """Parse the raw source of a page with lxml.
+
+    If parse_only is given, only the matching parts of the page are parsed.
+    """
+    return bs4.BeautifulSoup(html, "lxml", parse_only=parse_only)
+
+
+async def get_source(
+    url: str,
+    parse_only: bs4.SoupStrainer | None = None,
+) -> bs4.BeautifulSoup:
+    """Get the source of a page. Returns a BeautifulSoup object.
+
+    If parse_only is given, only the matching parts of the page are parsed.
+    """
+    return await asyncio.to_thread(parse_html, await fetch_html(url), parse_only)
+
+
+async def fetch_children_source(
+    obj: Make | Model | Trim,
+    semaphore: asyncio.Semaphore,
+) -> tuple[Make | Model | Trim, bytes] | None:
+    """Get the source code for an object, limiting the number of concurrent requests.
+
+    Returns the object and its raw source, or None if it could not be fetched.
+    """
+    async with semaphore:
         try:
-            if obj.children_source is not None:
-                logger.debug("Children Source already found for %s", obj.name)
-                continue
             logger.debug("Getting children source for %s", obj.name)
-            obj.children_source = await get_source(obj.children_url)
-            (
-                obj.children_source.append(
-                    await get_source(f"{obj.children_url}/equipamiento"),
-                )
-                if isinstance(obj, Trim)
-                else None
-            )
-            if isinstance(obj, Make):
-                await db.execute(
-                    "UPDATE makes SET children_source = ? WHERE id = ?",
-                    (str(obj.children_source), obj.id),
-                )
-            elif isinstance(obj, Model):
-                await db.execute(
-                    "UPDATE models SET children_source = ? WHERE id = ?",
-                    (str(obj.children_source), obj.id),
+            if isinstance(obj, Trim):
+                # The trim's data and equipment pages are fetched at the same time
+                html = b"".join(
+                    await asyncio.gather(
+                        fetch_html(obj.children_url),
+                        fetch_html(f"{obj.children_url}/equipamiento"),
+                    ),
                 )
             else:
-                await db.execute(
-                    "UPDATE trims SET children_source = ? WHERE id = ?",
-                    (str(obj.children_source), obj.id),
-                )
-            await db.commit()
+                html = await fetch_html(obj.children_url)
+            # Parse in a thread, so the other requests keep going meanwhile
+            obj.children_source = await asyncio.to_thread(
+                parse_html,
+                html,
+                obj.CHILDREN_STRAINER,
+            )
         except Exception:
             logger.exception(
                 "Error getting children source for %s\nURL: %s:",
                 obj.name,
                 obj.children_url,
             )
+            return None
+    return obj, html
+
+
+async def get_children_sources(
+    parents_list: Sequence[Make | Model | Trim],
+    db: aiosqlite.Connection,
+) -> None:
+    """Get the source code for each object in the list and process it.
+
+    All the objects in the list must be of the same class.
+    """
+    # Resolve the labels and the table once for the whole list
+    parent, child = CHILDREN_LABELS[type(parents_list[0])]
+    table = parents_list[0].TABLE
+    logger.info("%sGetting the %ss for each %s.%s", BOLD, child, parent, BOLD_END)
+    pending: list[Make | Model | Trim] = []
+    for obj in parents_list:
+        if obj.children_source is not None:
+            logger.debug("Children Source already found for %s", obj.name)
+            continue
+        pending.append(obj)
+
+    # Fetch the sources at the same time, writing them in batches as they arrive
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    sources: list[tuple[bytes | str, int]] = []
+    for task in tqdm_asyncio.as_completed(
+        [fetch_children_source(obj, semaphore) for obj in pending],
+        desc=f"Getting {child}s sources",
+        smoothing=0,
+        mininterval=PROGRESS_MININTERVAL,
+    ):
+        result = await task
+        if result is None:
+            continue
+        obj, html = result
+        # Store the raw source, rather than serializing the parsed one again
+        sources.append((html, obj.id))
+        if len(sources) >= SOURCES_BATCH_SIZE:
+            await flush_children_sources(table, sources, db)
+
+    # Write the remaining sources
+    if sources:
+        await flush_children_sources(table, sources, db)
+
+
+async def flush_children_sources(
+    table: str,
+    rows: list[tuple[bytes | str, int]],
+    db: aiosqlite.Connection,
+) -> None:
+    """Write and clear a batch of children sources, logging any error."""
+    try:
+        await write_children_sources(table, rows, db)
+    except Exception:
+        logger.exception("Error saving %d children sources of %s", len(rows), table)
+    rows.clear()
+
+
+async def write_specops(
+    trims: list[Trim],
+    db: aiosqlite.Connection,
+) -> None:
+    """Store the parsed specs and options of the trims, so they are not parsed again."""
+    async with db.cursor() as cursor:
+        await cursor.executemany(
+            "INSERT OR REPLACE INTO specops (trim_id, specs, options) VALUES (?, ?, ?)",
+            [
+                (trim.id, orjson.dumps(trim.specs), orjson.dumps(trim.options))
+                for trim in trims
+            ],
+        )
+    await db.commit()
 
 
 async def process_children_sources(
@@ -314,10 +533,12 @@ async def process_children_sources(
     db: aiosqlite.Connection,
 ) -> None:
     """Process the source code for each object in the list."""
+    parsed_trims: list[Trim] = []
     for parent in tqdm(
         parents_list,
         desc=f"Processing {parents_list[0].__class__.__name__}s",
         smoothing=0,
+        mininterval=PROGRESS_MININTERVAL,
     ):
         try:
             logger.debug("Processing %s", parent.name)
@@ -329,37 +550,34 @@ async def process_children_sources(
                 await parent.get_trims(db)
             else:
                 logger.debug("Getting options for %s", parent.name)
-                await parent.get_specops(db)
+                if parent.get_specops():
+                    parsed_trims.append(parent)
+                if len(parsed_trims) >= SPECOPS_BATCH_SIZE:
+                    await write_specops(parsed_trims, db)
+                    parsed_trims.clear()
         except Exception:
             logger.exception("Error getting %s", parent.name)
 
+    # Store the remaining specs and options
+    if parsed_trims:
+        await write_specops(parsed_trims, db)
+
 
 def report_progress(makes_list: list[Make]) -> None:
     """Log the progress of the database."""
+    # Count everything in a single traversal of the tree
+    n_models = n_trims = n_options = 0
+    for make in makes_list:
+        n_models += len(make.models)
+        for model in make.models:
+            n_trims += len(model.trims)
+            for trim in model.trims:
+                n_options += len(trim.options)
+
     text = "Database has:"
-    text += f"\n\t{len(makes_list)} makes" if any(makes_list) else ""
-    text += (
-        f"\n\t{len([model for make in makes_list for model in make.models])} models"
-        if any(model for make in makes_list for model in make.models)
-        else ""
-    )
-    text += (
-        f"\n\t{len([trim for make in makes_list for model in make.models for trim in model.trims])} trims"
-        if any(
-            trim for make in makes_list for model in make.models for trim in model.trims
-        )
-        else ""
-    )
-    text += (
-        f"\n\t{len([option for make in makes_list for model in make.models for trim in model.trims for option in trim.options])} options"
-        if any(
-            option
-            for make in makes_list
-            for model in make.models
-            for trim in model.trims
-            for option in trim.options
-        )
-        else ""
-    )
+    text += f"\n\t{len(makes_list)} makes" if makes_list else ""
+    text += f"\n\t{n_models} models" if n_models else ""
+    text += f"\n\t{n_trims} trims" if n_trims else ""
+    text += f"\n\t{n_options} options" if n_options else ""
     text += "\n"
     logger.info(text)
@@ -1,7 +1,7 @@
 """This file contains the worker code."""
 
 import logging
-import subprocess
+import socket
 
 import aiohttp
 from arq.connections import RedisSettings
@@ -22,11 +22,10 @@ REDIS_SETTINGS = RedisSettings(
     password=password,
 )
 print("Worker started.")
-command = ["redis-cli", "-h", "localhost", "ping"]
-try:
-    is_local = "PONG" in subprocess.check_output(command).decode()
-except FileNotFoundError:
-    is_local = False
+# Check if there is a Redis server listening locally, without spawning redis-cli
+with socket.socket() as probe:
+    probe.settimeout(0.1)
+    is_local = probe.connect_ex(("127.0.0.1", port)) == 0
 print(is_local)
 if is_local:
     host = "localhost"
@@ -34,11 +33,27 @@ if is_local:
     print("Connected to local Redis.")
 
 
+async def startup(ctx) -> None:
+    """Create the client session shared by every job of the worker."""
+    ctx["session"] = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=20,
+            keepalive_timeout=75,
+            ttl_dns_cache=300,
+        ),
+    )
+
+
+async def shutdown(ctx) -> None:
+    """Close the client session shared by every job of the worker."""
+    await ctx["session"].close()
+
+
 async def get_source(ctx, url: str) -> str:
     """Get the source of a page. Returns a BeautifulSoup object."""
     try:
-        async with aiohttp.ClientSession() as session:
-            html = await session.get(url)
+        async with ctx["session"].get(url) as html:
             source = await html.text()
     except aiohttp.TooManyRedirects:
         logger.exception(f"Too many redirects for {url}.")
@@ -50,6 +65,8 @@ class w_settings:
     """This class is used to configure the worker."""
 
     functions = [get_source]
+    on_startup = startup
+    on_shutdown = shutdown
     redis_settings = REDIS_SETTINGS
     max_jobs = 10_000
     queue_read_limit = 10